@@ -6,9 +6,20 @@ import textwrap
 import re
 import os
 import json
+import math
+import functools
+import copy
+import types
+import uuid
 from datetime import datetime
 from pathlib import Path
+from collections import OrderedDict
+from collections.abc import Mapping
 import traceback
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from utils.utils import log_json_block, log_step, log_error, log_json_block
 from agent.agentSession import ExecutionSnapshot
 
@@ -47,53 +58,106 @@ SAFE_BUILTINS = [
 MAX_FUNCTIONS = 20
 TIMEOUT_PER_FUNCTION = 50
 
-class KeywordStripper(ast.NodeTransformer):
-    """Rewrite all function calls to remove keyword args and keep only values as positional."""
-    def visit_Call(self, node):
-        self.generic_visit(node)
-        if node.keywords:
-            # Convert all keyword arguments into positional args (discard names)
-            for kw in node.keywords:
-                node.args.append(kw.value)
-            node.keywords = []
-        return node
+_TRIPLE_QUOTE = '"""'
+_UNBOUND_VAR_RE = re.compile(r"local variable '(\w+)' referenced before assignment")
+_ATTR_NAME_RE = re.compile(r"'(\w+)'")
+# Result strings that start with "error executing tool" / "error:" or mention "failed"
+_ERROR_SCAN_RE = re.compile(r"\Aerror(?: executing tool|:)|failed", re.IGNORECASE)
+
+# Resolved once at import; build_safe_globals hands each sandbox its own copy
+# so user code mutating __builtins__ can't leak into later runs.
+_SAFE_BUILTINS_DICT = {k: getattr(builtins, k) for k in SAFE_BUILTINS}
+_ALLOWED_MODULE_OBJS = {m: __import__(m) for m in ALLOWED_MODULES}
+
+# Python 3.12+: tool calls that finish without suspending complete inline
+# instead of round-tripping through the event loop scheduler.
+_eager_task_factory = getattr(asyncio, "eager_task_factory", None)
+
+@functools.lru_cache(maxsize=256)
+def _return_dict_template(varname: str) -> ast.Return:
+    """Parsed `return {"varname": varname}`; shared, so callers must not mutate it."""
+    return ast.parse(f"return {{{varname!r}: {varname}}}").body[0]
 
 
 # ───────────────────────────────────────────────────────────────
-# AST TRANSFORMER: auto-await known async MCP tools
+# AST TRANSFORMER: single pass over the user code
+#   - strips keyword args (keeps values as positional)
+#   - auto-awaits known async MCP tools
+#   - counts calls for the MAX_FUNCTIONS check
+#   - rewrites top-level `return <varname>` → `return {"varname": varname}`
+#   - records top-level assignment targets
 # ───────────────────────────────────────────────────────────────
-class AwaitTransformer(ast.NodeTransformer):
+class _FusedTransformer(ast.NodeTransformer):
     def __init__(self, async_funcs):
         self.async_funcs = async_funcs
+        self.call_count = 0
+        self.toplevel_assigns = set()
+        self.has_return = False
+
+    def visit_Module(self, node):
+        new_body = []
+        for stmt in node.body:
+            stmt = self.visit(stmt)
+            if isinstance(stmt, ast.Return):
+                self.has_return = True
+                if isinstance(stmt.value, ast.Name):
+                    template = _return_dict_template(stmt.value.id)
+                    stmt = ast.copy_location(copy.copy(template), stmt)
+            elif isinstance(stmt, ast.Assign) and isinstance(stmt.targets[0], ast.Name):
+                self.toplevel_assigns.add(stmt.targets[0].id)
+            new_body.append(stmt)
+        node.body = new_body
+        return node
 
     def visit_Call(self, node):
         self.generic_visit(node)
+        self.call_count += 1
+        if node.keywords:
+            # Convert all keyword arguments into positional args (discard names)
+            for kw in node.keywords:
+                node.args.append(kw.value)
+            node.keywords = []
         if isinstance(node.func, ast.Name) and node.func.id in self.async_funcs:
             return ast.Await(value=node)
         return node
 
 
-
 def fix_unterminated_triple_quotes(code: str) -> str:
-    import re
-    triple_quotes = re.findall(r'''"""''', code)
-    if len(triple_quotes) % 2 != 0:
+    if code.count(_TRIPLE_QUOTE) & 1:
         log_error("Fixing unterminated triple-quoted string...", symbol="⚠️ ")
-        return code + '\n"""'
+        return code + "\n" + _TRIPLE_QUOTE
     return code
 
 
+class _FilteredView(Mapping):
+    """Read-only view of the sandbox globals minus the sandbox plumbing; nothing is copied up front."""
+    _EXCLUDED = frozenset({"__builtins__", "final_answer", "parallel", "globals_schema"})
+
+    def __init__(self, data: dict):
+        self._data = data
+
+    def __getitem__(self, key):
+        if key in self._EXCLUDED:
+            raise KeyError(key)
+        return self._data[key]
+
+    def __iter__(self):
+        return (k for k in self._data if k not in self._EXCLUDED)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
 def build_safe_globals(mcp_funcs: dict, multi_mcp=None, session_id: str = None) -> dict:
     safe_globals = {
-        "__builtins__": {
-            k: getattr(builtins, k) for k in SAFE_BUILTINS
-        },
+        "__builtins__": dict(_SAFE_BUILTINS_DICT),
         **mcp_funcs,
+        **_ALLOWED_MODULE_OBJS,
     }
 
-    for module in ALLOWED_MODULES:
-        safe_globals[module] = __import__(module)
-
     safe_globals["final_answer"] = lambda x: safe_globals.setdefault("result_holder", x)
 
     if session_id:
@@ -102,46 +166,136 @@ def build_safe_globals(mcp_funcs: dict, multi_mcp=None, session_id: str = None)
     if multi_mcp:
         async def parallel(*tool_calls):
             coros = [multi_mcp.function_wrapper(tool_name, *args) for tool_name, *args in tool_calls]
+            if _eager_task_factory is not None:
+                loop = asyncio.get_running_loop()
+                coros = [_eager_task_factory(loop, coro) for coro in coros]
             return await asyncio.gather(*coros)
         safe_globals["parallel"] = parallel
 
     # Allow both direct access (`urls`) and schema-style (`globals_schema.get("urls", "")`)
-    safe_globals["globals_schema"] = {
-        k: v for k, v in safe_globals.items() if k not in {"__builtins__", "final_answer", "parallel"}
-    }
+    safe_globals["globals_schema"] = _FilteredView(safe_globals)
 
     return safe_globals
 
 
-def save_session_vars(session_id: str, variables: dict):
-    os.makedirs("action/sandbox_state", exist_ok=True)
-    path = f"action/sandbox_state/{session_id}.json"
+SANDBOX_STATE_DIR = "action/sandbox_state"
 
-    # Load existing vars if any
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            existing = json.load(f)
-    except FileNotFoundError:
-        existing = {}
+# In-process mirror of action/sandbox_state/<session_id>.json, so each run skips
+# re-reading the file it just wrote. It holds the serialized bytes and every load
+# decodes a fresh copy, so a sandbox mutating a list or dict in place can't leak
+# into later runs or into the step result that was saved. Each query gets a new
+# session id, so only the most recently used sessions are kept.
+SESSION_CACHE_SIZE = 16
+_SESSION_CACHE: "OrderedDict[str, bytes]" = OrderedDict()
 
-    # Merge
-    merged = {**existing, **variables}
 
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(merged, f, indent=2, ensure_ascii=False)
+def _cache_session(session_id: str, data: bytes) -> None:
+    # pop + insert rather than move_to_end: parallel-mode threads may evict concurrently
+    _SESSION_CACHE.pop(session_id, None)
+    _SESSION_CACHE[session_id] = data
+    while len(_SESSION_CACHE) > SESSION_CACHE_SIZE:
+        try:
+            _SESSION_CACHE.popitem(last=False)
+        except KeyError:
+            break
 
 
-def load_session_vars(session_id: str) -> dict:
+def _load_session_bytes(data: bytes) -> dict:
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            pass  # NaN/Infinity, which orjson rejects; stdlib json reads them
+    return json.loads(data)
+
+
+def _session_path(session_id: str) -> str:
+    return os.path.join(SANDBOX_STATE_DIR, f"{session_id}.json")
+
+
+def _has_non_finite(obj) -> bool:
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, dict):
+        return any(_has_non_finite(k) or _has_non_finite(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return any(_has_non_finite(v) for v in obj)
+    return False
+
+
+def _dump_session(state: dict) -> bytes:
+    if orjson is not None:
+        try:
+            data = orjson.dumps(state, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # e.g. ints wider than 64 bits; stdlib json still handles those
+        else:
+            # orjson writes NaN/Infinity as null; stdlib json keeps them. Only
+            # scan for them when the output actually contains a null.
+            if b"null" not in data or not _has_non_finite(state):
+                return data
+    return json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def save_session_vars(session_id: str, variables: dict):
+    merged = {**load_session_vars(session_id), **variables}
+    data = _dump_session(merged)
+
+    # Write to a temp file and swap it in, so a crash never leaves half a file.
+    # A unique name keeps concurrent writers (parallel mode) apart, and plain
+    # open() keeps the file mode under the umask like the state files themselves.
+    os.makedirs(SANDBOX_STATE_DIR, exist_ok=True)
+    path = _session_path(session_id)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
     try:
-        with open(f"action/sandbox_state/{session_id}.json", "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
+        with open(tmp_path, "xb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    _cache_session(session_id, data)
 
 
-def count_function_calls(code: str) -> int:
-    tree = ast.parse(code)
-    return sum(isinstance(node, ast.Call) for node in ast.walk(tree))
+def load_session_vars(session_id: str) -> dict:
+    data = _SESSION_CACHE.get(session_id)
+    if data is None:
+        try:
+            with open(_session_path(session_id), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return {}
+        _cache_session(session_id, data)
+    return _load_session_bytes(data)
+
+
+_PRIMITIVE_TYPES = (str, int, float, bool, type(None), list, dict)
+_PRIMITIVE_SET = frozenset(_PRIMITIVE_TYPES)
+_MISSING = object()
+
+
+def is_json_serializable(value):
+    return isinstance(value, _PRIMITIVE_TYPES)
+
+
+def serialize_result(v):
+    # Exact-type lookup covers the common case without walking the isinstance chain
+    if type(v) in _PRIMITIVE_SET or isinstance(v, _PRIMITIVE_TYPES):
+        return v
+    content = getattr(v, "content", _MISSING)
+    success = getattr(v, "success", _MISSING)
+    if success is not _MISSING and content is not _MISSING and hasattr(v, "error"):
+        # Handle ActionResultOutput from MCP tools
+        if not success:
+            return f"Error executing tool: {v.error}"
+        return content if content else "Success"
+    elif isinstance(content, list):
+        return "\n".join(x.text for x in content if hasattr(x, "text"))
+    else:
+        return str(v)
 
 
 def make_tool_proxy(tool_name: str, mcp):
@@ -149,15 +303,156 @@ def make_tool_proxy(tool_name: str, mcp):
         return await mcp.function_wrapper(tool_name, *args)
     return _tool_fn
 
+
+BROWSER_TOOLS = ('open_tab', 'search_google', 'input_text_by_index', 'click_element_by_index')
+
+# Tool set most recently reported by _get_tool_funcs, so the availability log
+# runs once per tool set rather than on every run
+_logged_tool_names: frozenset | None = None
+
+
+def _get_tool_funcs(multi_mcp) -> tuple[dict, frozenset]:
+    global _logged_tool_names
+    # The frozenset of names doubles as the compile-cache key
+    tool_funcs, async_funcs = multi_mcp.get_tool_proxies()
+    if async_funcs == _logged_tool_names:
+        return tool_funcs, async_funcs
+    _logged_tool_names = async_funcs
+    tool_names = list(tool_funcs)
+
+    # Log available tools for debugging (once per tool set, not on every run)
+    if not tool_funcs:
+        log_error("⚠️  No tools available! Check MCP server connections.", symbol="⚠️")
+    else:
+        available_browser_tools = [t for t in BROWSER_TOOLS if t in tool_funcs]
+        if available_browser_tools:
+            log_step(f"✅ Browser tools available: {', '.join(available_browser_tools)}", symbol="✅")
+        else:
+            log_error(f"⚠️  Browser tools NOT available. Make sure browser MCP server is running on port 8100.", symbol="⚠️")
+            log_error(f"   Available tools: {', '.join(tool_names[:10])}{'...' if len(tool_names) > 10 else ''}", symbol="   ")
+    return tool_funcs, async_funcs
+
+@functools.lru_cache(maxsize=256)
+def _compile_user_code(cleaned_code: str, async_funcs: frozenset) -> tuple:
+    """Parse, transform and compile user code into the code object of `async def __main()`.
+
+    Returns (code object, call count). The result depends only on the code and the
+    tool names, so retries of the same snippet skip the whole pipeline.
+    """
+    tree = ast.parse(cleaned_code)
+
+    # ─── AST Transformations ─────────────────────────────────────
+    transformer = _FusedTransformer(async_funcs)
+    tree = transformer.visit(tree)
+
+    # If return is missing but 'result' exists, add `return result`
+    if not transformer.has_return and "result" in transformer.toplevel_assigns:
+        tree.body.append(ast.Return(value=ast.Name(id="result", ctx=ast.Load())))
+
+    # ─── Wrap as async def __main() ──────────────────────────────
+    func_def = ast.AsyncFunctionDef(
+        name="__main",
+        args=ast.arguments(posonlyargs=[], args=[], kwonlyargs=[], kw_defaults=[], defaults=[]),
+        body=tree.body,
+        decorator_list=[]
+    )
+    wrapper = ast.Module(body=[func_def], type_ignores=[])
+    ast.fix_missing_locations(wrapper)
+
+    module_code = compile(wrapper, filename="<user_code>", mode="exec")
+    # Keep only the function body; callers bind it to their sandbox directly
+    main_code = next(c for c in module_code.co_consts if isinstance(c, types.CodeType))
+    return main_code, transformer.call_count
+
+
+# ─── Error suggestions (str.format templates) ──────────────────
+_UNBOUND_VAR_SUGGESTION = (
+    "UnboundLocalError: Variable '{var_name}' was accessed before being assigned a value.\n"
+    "This usually happens when:\n"
+    "  1. A tool call failed and the result wasn't checked before use\n"
+    "  2. The variable is used in a conditional that didn't execute\n"
+    "  3. The tool returned an error instead of expected data\n\n"
+    "💡 Fix: Always check if tool calls succeeded and handle errors:\n"
+    "   result = await tool_name(...)\n"
+    "   if isinstance(result, str) and result.startswith('[error]'):\n"
+    "       # Handle error case\n"
+    "   else:\n"
+    "       # Use result safely\n"
+)
+_UNBOUND_GENERIC_SUGGESTION = (
+    "UnboundLocalError: A variable was accessed before being assigned.\n"
+    "Check your code to ensure all variables are assigned before use."
+)
+_ATTRIBUTE_ERROR_SUGGESTION = (
+    "AttributeError: '{attr_name}' attribute not found.\n\n"
+    "This often happens when:\n"
+    "  1. Extracting data from dynamic websites (real estate, e-commerce)\n"
+    "  2. The page structure changed or content hasn't loaded yet\n"
+    "  3. Trying to access attributes on None/empty objects\n\n"
+    "💡 Fix strategies:\n"
+    "  - Wait for page to load: use `wait(3)` after navigation\n"
+    "  - Check if object exists before accessing: `if result and hasattr(result, '{attr_name}'):`\n"
+    "  - Use `get_comprehensive_markdown()` to see actual page content\n"
+    "  - Try extracting raw text first, then parse patterns\n"
+    "  - Scroll to reveal content: `scroll_down(500)`\n"
+    "  - Take screenshot to verify page state: `take_screenshot()`\n\n"
+    "Original error: {error_msg}"
+)
+_ATTRIBUTE_GENERIC_SUGGESTION = (
+    "AttributeError: An attribute was accessed that doesn't exist.\n\n"
+    "This often happens with dynamic websites where content loads via JavaScript.\n"
+    "Try waiting longer, checking if objects exist, or extracting raw text instead.\n\n"
+    "Original error: {error_msg}"
+)
+_TYPE_ERROR_SUBSCRIPT_SUGGESTION = (
+    "TypeError: Trying to access a string as if it were a dictionary or list.\n\n"
+    "This often happens when:\n"
+    "  1. A tool returned a string (possibly an error message) instead of expected dict/list\n"
+    "  2. JSON parsing failed and returned a string\n"
+    "  3. Trying to access result['key'] when result is actually a string\n\n"
+    "💡 Fix strategies:\n"
+    "  - Always check the type before accessing: `if isinstance(result, dict):`\n"
+    "  - Check for error messages: `if isinstance(result, str) and result.startswith('[error]'):`\n"
+    "  - Validate tool results: `if result and isinstance(result, (dict, list)):`\n"
+    "  - Handle string results: `if isinstance(result, str): result = json.loads(result)`\n"
+    "  - Use safe access: `result.get('key') if isinstance(result, dict) else None`\n\n"
+    "Example safe code:\n"
+    "  result = tool_call()\n"
+    "  if isinstance(result, str):\n"
+    "      if result.startswith('[error]'):\n"
+    "          return {{ 'error_0A': result }}\n"
+    "      try:\n"
+    "          result = json.loads(result)\n"
+    "      except:\n"
+    "          return {{ 'error_0A': 'Failed to parse result' }}\n"
+    "  if isinstance(result, dict) and 'key' in result:\n"
+    "      value = result['key']\n"
+    "  else:\n"
+    "      return {{ 'error_0A': 'Unexpected result format' }}\n\n"
+    "Original error: {error_msg}"
+)
+
+# Callers only surface "error"; set EAG_VERBOSE_TRACEBACK=1 to also get the
+# formatted traceback in the result dict.
+VERBOSE_TRACEBACK = os.getenv("EAG_VERBOSE_TRACEBACK") == "1"
+
+
+def _format_traceback():
+    """Formatted traceback of the exception being handled, or None unless verbose."""
+    return traceback.format_exc() if VERBOSE_TRACEBACK else None
+
+
 async def run_user_code(code: str, multi_mcp, session_id: str = "default_session") -> dict:
     start_time = time.perf_counter()
     start_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    def is_json_serializable(value):
-        return isinstance(value, (str, int, float, bool, type(None), list, dict))
-
     try:
-        func_count = count_function_calls(code)
+        tool_funcs, async_funcs = _get_tool_funcs(multi_mcp)
+
+        log_step(f"[CODE:]: {code}", symbol="🐍")
+
+        cleaned_code = fix_unterminated_triple_quotes(textwrap.dedent(code.strip()))
+        compiled, func_count = _compile_user_code(cleaned_code, async_funcs)
         if func_count > MAX_FUNCTIONS:
             return {
                 "status": "error",
@@ -166,140 +461,37 @@ async def run_user_code(code: str, multi_mcp, session_id: str = "default_session
                 "total_time": str(round(time.perf_counter() - start_time, 3))
             }
 
-        tool_funcs = {
-            tool.name: make_tool_proxy(tool.name, multi_mcp)
-            for tool in multi_mcp.get_all_tools()
-        }
-        
-        # Log available tools for debugging
-        if not tool_funcs:
-            log_error("⚠️  No tools available! Check MCP server connections.", symbol="⚠️")
-        else:
-            tool_names = list(tool_funcs.keys())
-            browser_tools = ['open_tab', 'search_google', 'input_text_by_index', 'click_element_by_index']
-            available_browser_tools = [t for t in browser_tools if t in tool_names]
-            if available_browser_tools:
-                log_step(f"✅ Browser tools available: {', '.join(available_browser_tools)}", symbol="✅")
-            else:
-                log_error(f"⚠️  Browser tools NOT available. Make sure browser MCP server is running on port 8100.", symbol="⚠️")
-                log_error(f"   Available tools: {', '.join(tool_names[:10])}{'...' if len(tool_names) > 10 else ''}", symbol="   ")
-
         sandbox = build_safe_globals(tool_funcs, multi_mcp, session_id)
-        local_vars = {}
-
-        log_step(f"[CODE:]: {code}", symbol="🐍")
-
-        cleaned_code = fix_unterminated_triple_quotes(textwrap.dedent(code.strip()))
-        tree = ast.parse(cleaned_code)
-
-        # ─── AST Transformations ─────────────────────────────────────
-        tree = KeywordStripper().visit(tree)
-        tree = AwaitTransformer(set(tool_funcs)).visit(tree)
-
-        # Rewrite return <varname> → return {"varname": varname}
-        new_body = []
-        return_found = False
-        for node in tree.body:
-            if isinstance(node, ast.Return):
-                return_found = True
-                if isinstance(node.value, ast.Name):
-                    varname = node.value.id
-                    new_body.append(
-                        ast.Return(
-                            value=ast.Dict(
-                                keys=[ast.Constant(value=varname)],
-                                values=[ast.Name(id=varname, ctx=ast.Load())]
-                            )
-                        )
-                    )
-                else:
-                    new_body.append(node)
-            else:
-                new_body.append(node)
-
-        # If return is missing but 'result' exists, add `return result`
-        has_result_var = any(
-            isinstance(node, ast.Assign)
-            and any(isinstance(t, ast.Name) and t.id == "result" for t in node.targets)
-            for node in new_body
-        )
-        result_vars = {
-            node.targets[0].id
-            for node in tree.body
-            if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name)
-        }
-
-        if not return_found and "result" in result_vars:
-            new_body.append(ast.Return(value=ast.Name(id="result", ctx=ast.Load())))
-
-
-        ast.fix_missing_locations(tree)
-        tree.body = new_body
-        ast.fix_missing_locations(tree)
-
-        # ─── Wrap as async def __main() ──────────────────────────────
-        func_def = ast.AsyncFunctionDef(
-            name="__main",
-            args=ast.arguments(posonlyargs=[], args=[], kwonlyargs=[], kw_defaults=[], defaults=[]),
-            body=tree.body,
-            decorator_list=[]
-        )
-        wrapper = ast.Module(body=[func_def], type_ignores=[])
-        ast.fix_missing_locations(wrapper)
-        
-
-        compiled = compile(wrapper, filename="<user_code>", mode="exec")
-        exec(compiled, sandbox, local_vars)
+        main = types.FunctionType(compiled, sandbox, "__main")
 
         # ─── Execute and collect result ──────────────────────────────
         timeout = max(3, func_count * TIMEOUT_PER_FUNCTION)
-        returned = await asyncio.wait_for(local_vars["__main"](), timeout=timeout)
+        async with asyncio.timeout(timeout):
+            returned = await main()
 
-        result_value = {}
-        
-
-        def serialize_result(v):
-            if isinstance(v, (str, int, float, bool, type(None), list, dict)):
-                return v
-            elif hasattr(v, "success") and hasattr(v, "content") and hasattr(v, "error"):
-                # Handle ActionResultOutput from MCP tools
-                if not v.success:
-                    return f"Error executing tool: {v.error}"
-                return v.content if v.content else "Success"
-            elif hasattr(v, "content") and isinstance(v.content, list):
-                return "\n".join(x.text for x in v.content if hasattr(x, "text"))
-            else:
-                return str(v)
-
-        if isinstance(returned, dict) and list(returned.keys()) == ["result"]:
-            result_value = {"result": serialize_result(returned["result"])}
         if isinstance(returned, dict):
-            result_value = {k: serialize_result(v) for k, v in returned.items()}
-            
-            # Check for MCP tool failures or error messages
-            for v in result_value.values():
-                if isinstance(v, str) and (
-                    v.lower().startswith("error executing tool") or
-                    v.lower().startswith("error:") or
-                    "failed" in v.lower()
-                ):
+            # Serialize and check for MCP tool failures in one pass, stopping at the first
+            result_value = {}
+            for k, v in returned.items():
+                sv = serialize_result(v)
+                # Error messages returned as strings
+                if isinstance(sv, str) and _ERROR_SCAN_RE.search(sv):
                     return {
-                        "status": "error", 
-                        "error": v,
+                        "status": "error",
+                        "error": sv,
                         "execution_time": start_timestamp,
                         "total_time": str(round(time.perf_counter() - start_time, 3))
                     }
-            
-            # Check if any MCP tool returned success=False
-            for k, v in returned.items():
-                if hasattr(v, "success") and not v.success:
-                    error_msg = v.error if hasattr(v, "error") and v.error else f"Tool {k} failed"
+                # MCP tool results with success=False
+                if not getattr(v, "success", True):
+                    error_msg = getattr(v, "error", None) or f"Tool {k} failed"
                     return {
                         "status": "error",
                         "error": error_msg,
                         "execution_time": start_timestamp,
                         "total_time": str(round(time.perf_counter() - start_time, 3))
                     }
+                result_value[k] = sv
 
         else:
             result_value = {"result": serialize_result(returned)}
@@ -331,30 +523,14 @@ async def run_user_code(code: str, multi_mcp, session_id: str = "default_session
     except UnboundLocalError as e:
         # Handle UnboundLocalError - variable accessed before assignment
         error_msg = str(e)
-        tb = traceback.format_exc()
-        
+        tb = _format_traceback()
+
         # Try to extract variable name from error
-        var_match = re.search(r"local variable '(\w+)' referenced before assignment", error_msg)
+        var_match = _UNBOUND_VAR_RE.search(error_msg)
         if var_match:
-            var_name = var_match.group(1)
-            suggestion = (
-                f"UnboundLocalError: Variable '{var_name}' was accessed before being assigned a value.\n"
-                f"This usually happens when:\n"
-                f"  1. A tool call failed and the result wasn't checked before use\n"
-                f"  2. The variable is used in a conditional that didn't execute\n"
-                f"  3. The tool returned an error instead of expected data\n\n"
-                f"💡 Fix: Always check if tool calls succeeded and handle errors:\n"
-                f"   result = await tool_name(...)\n"
-                f"   if isinstance(result, str) and result.startswith('[error]'):\n"
-                f"       # Handle error case\n"
-                f"   else:\n"
-                f"       # Use result safely\n"
-            )
+            suggestion = _UNBOUND_VAR_SUGGESTION.format(var_name=var_match.group(1))
         else:
-            suggestion = (
-                f"UnboundLocalError: A variable was accessed before being assigned.\n"
-                f"Check your code to ensure all variables are assigned before use."
-            )
+            suggestion = _UNBOUND_GENERIC_SUGGESTION
         
         log_error(f"UnboundLocalError: {error_msg}", symbol="❌")
         return {
@@ -367,7 +543,7 @@ async def run_user_code(code: str, multi_mcp, session_id: str = "default_session
     except NameError as e:
         # Special handling for missing browser tools
         error_msg = str(e)
-        if any(tool in error_msg for tool in ['open_tab', 'search_google', 'input_text_by_index', 'click_element_by_index']):
+        if any(tool in error_msg for tool in BROWSER_TOOLS):
             return {
                 "status": "error",
                 "error": f"{type(e).__name__}: {error_msg}\n\n⚠️  Browser tools are not available. Make sure the browser MCP server is running:\n   uv run .\\browserMCP\\browser_mcp_sse.py",
@@ -377,15 +553,15 @@ async def run_user_code(code: str, multi_mcp, session_id: str = "default_session
         return {
             "status": "error",
             "error": f"{type(e).__name__}: {error_msg}\n\n💡 This usually means a function or variable name is misspelled or not defined.",
-            "traceback": traceback.format_exc(),
+            "traceback": _format_traceback(),
             "execution_time": start_timestamp,
             "total_time": str(round(time.perf_counter() - start_time, 3))
         }
     except ValueError as e:
         # Better handling for ValueError (often from tool argument mismatches)
         error_msg = str(e)
-        tb = traceback.format_exc()
-        
+        tb = _format_traceback()
+
         if "expects" in error_msg and "args" in error_msg:
             suggestion = (
                 f"ValueError: Tool argument mismatch.\n"
@@ -406,34 +582,14 @@ async def run_user_code(code: str, multi_mcp, session_id: str = "default_session
     except AttributeError as e:
         # Handle AttributeError - often from data extraction on dynamic websites
         error_msg = str(e)
-        tb = traceback.format_exc()
-        
+        tb = _format_traceback()
+
         # Try to extract attribute name from error
-        attr_match = re.search(r"'(\w+)'", error_msg)
+        attr_match = _ATTR_NAME_RE.search(error_msg)
         if attr_match:
-            attr_name = attr_match.group(1)
-            suggestion = (
-                f"AttributeError: '{attr_name}' attribute not found.\n\n"
-                f"This often happens when:\n"
-                f"  1. Extracting data from dynamic websites (real estate, e-commerce)\n"
-                f"  2. The page structure changed or content hasn't loaded yet\n"
-                f"  3. Trying to access attributes on None/empty objects\n\n"
-                f"💡 Fix strategies:\n"
-                f"  - Wait for page to load: use `wait(3)` after navigation\n"
-                f"  - Check if object exists before accessing: `if result and hasattr(result, '{attr_name}'):`\n"
-                f"  - Use `get_comprehensive_markdown()` to see actual page content\n"
-                f"  - Try extracting raw text first, then parse patterns\n"
-                f"  - Scroll to reveal content: `scroll_down(500)`\n"
-                f"  - Take screenshot to verify page state: `take_screenshot()`\n\n"
-                f"Original error: {error_msg}"
-            )
+            suggestion = _ATTRIBUTE_ERROR_SUGGESTION.format(attr_name=attr_match.group(1), error_msg=error_msg)
         else:
-            suggestion = (
-                f"AttributeError: An attribute was accessed that doesn't exist.\n\n"
-                f"This often happens with dynamic websites where content loads via JavaScript.\n"
-                f"Try waiting longer, checking if objects exist, or extracting raw text instead.\n\n"
-                f"Original error: {error_msg}"
-            )
+            suggestion = _ATTRIBUTE_GENERIC_SUGGESTION.format(error_msg=error_msg)
         
         log_error(f"AttributeError: {error_msg}", symbol="❌")
         return {
@@ -446,37 +602,11 @@ async def run_user_code(code: str, multi_mcp, session_id: str = "default_session
     except TypeError as e:
         # Handle TypeError - often from accessing strings as dicts/lists
         error_msg = str(e)
-        tb = traceback.format_exc()
-        
+        tb = _format_traceback()
+
         # Check for common TypeError patterns
         if "string indices must be integers" in error_msg or "not subscriptable" in error_msg:
-            suggestion = (
-                f"TypeError: Trying to access a string as if it were a dictionary or list.\n\n"
-                f"This often happens when:\n"
-                f"  1. A tool returned a string (possibly an error message) instead of expected dict/list\n"
-                f"  2. JSON parsing failed and returned a string\n"
-                f"  3. Trying to access result['key'] when result is actually a string\n\n"
-                f"💡 Fix strategies:\n"
-                f"  - Always check the type before accessing: `if isinstance(result, dict):`\n"
-                f"  - Check for error messages: `if isinstance(result, str) and result.startswith('[error]'):`\n"
-                f"  - Validate tool results: `if result and isinstance(result, (dict, list)):`\n"
-                f"  - Handle string results: `if isinstance(result, str): result = json.loads(result)`\n"
-                f"  - Use safe access: `result.get('key') if isinstance(result, dict) else None`\n\n"
-                f"Example safe code:\n"
-                f"  result = tool_call()\n"
-                f"  if isinstance(result, str):\n"
-                f"      if result.startswith('[error]'):\n"
-                f"          return {{ 'error_0A': result }}\n"
-                f"      try:\n"
-                f"          result = json.loads(result)\n"
-                f"      except:\n"
-                f"          return {{ 'error_0A': 'Failed to parse result' }}\n"
-                f"  if isinstance(result, dict) and 'key' in result:\n"
-                f"      value = result['key']\n"
-                f"  else:\n"
-                f"      return {{ 'error_0A': 'Unexpected result format' }}\n\n"
-                f"Original error: {error_msg}"
-            )
+            suggestion = _TYPE_ERROR_SUBSCRIPT_SUGGESTION.format(error_msg=error_msg)
         elif "unsupported operand" in error_msg:
             suggestion = (
                 f"TypeError: Operation not supported for this data type.\n\n"
@@ -499,10 +629,10 @@ async def run_user_code(code: str, multi_mcp, session_id: str = "default_session
             "total_time": str(round(time.perf_counter() - start_time, 3))
         }
     except Exception as e:
-        print("⚠️ Code execution error:\n", traceback.format_exc())
-        error_msg = str(e)
         tb = traceback.format_exc()
-        
+        print("⚠️ Code execution error:\n", tb)
+        error_msg = str(e)
+
         # Check for Playwright browser executable errors
         if "Executable doesn't exist" in error_msg or "chrome.exe" in error_msg:
             return {
@@ -48,6 +48,11 @@ class AgentLoop:
 
         return await self._handle_failure()
 
+    async def aclose(self):
+        """Close the HTTP sessions held by the perception, decision and summarizer models"""
+        for component in (self.perception, self.decision, self.summarizer):
+            await component.model.aclose()
+
     def _initialize_session(self, query):
         self.session_id = str(uuid.uuid4())
         self.ctx = ContextManager(self.session_id, query)
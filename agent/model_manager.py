@@ -1,6 +1,7 @@
 import os
+import re
 import json
-import yaml
+import functools
 import requests
 import asyncio
 import random
@@ -8,6 +9,7 @@ from pathlib import Path
 from google import genai
 from google.genai.errors import ServerError
 from dotenv import load_dotenv
+from utils.yaml_loader import load_yaml
 
 load_dotenv()
 
@@ -15,15 +17,32 @@ ROOT = Path(__file__).parent.parent
 MODELS_JSON = ROOT / "config" / "models.json"
 PROFILE_YAML = ROOT / "config" / "profiles.yaml"
 
+_RETRY_DELAY_RE = re.compile(r'retry in ([\d.]+)s', re.IGNORECASE)
+_DURATION_RE = re.compile(r'([\d.]+)s')
+_RATE_LIMIT_TOKENS = ('429', 'RESOURCE_EXHAUSTED')
+
+@functools.lru_cache(maxsize=1)
+def _load_models() -> dict:
+    return json.loads(MODELS_JSON.read_text())
+
+
+@functools.lru_cache(maxsize=1)
+def _load_profile() -> dict:
+    return load_yaml(PROFILE_YAML.read_text())
+
+
 class ModelManager:
     def __init__(self):
-        self.config = json.loads(MODELS_JSON.read_text())
-        self.profile = yaml.safe_load(PROFILE_YAML.read_text())
+        self.config = _load_models()
+        self.profile = _load_profile()
 
         self.text_model_key = self.profile["llm"]["text_generation"]
         self.model_info = self.config["models"][self.text_model_key]
         self.model_type = self.model_info["type"]
 
+        # Shared aiohttp session for Ollama, created on first use
+        self._http_session = None
+
         # ✅ Gemini initialization with new library
         if self.model_type == "gemini":
             api_key = os.getenv("GEMINI_API_KEY")
@@ -57,8 +76,7 @@ class ModelManager:
         try:
             error_str = str(error)
             # Look for retry delay in error message: "Please retry in 47.452700763s"
-            import re
-            match = re.search(r'retry in ([\d.]+)s', error_str, re.IGNORECASE)
+            match = _RETRY_DELAY_RE.search(error_str)
             if match:
                 return float(match.group(1))
             
@@ -69,7 +87,7 @@ class ModelManager:
                     if detail.get('@type') == 'type.googleapis.com/google.rpc.RetryInfo':
                         retry_delay = detail.get('retryDelay', '')
                         # Parse duration string like "47s" or "47.452700763s"
-                        match = re.search(r'([\d.]+)s', retry_delay)
+                        match = _DURATION_RE.search(retry_delay)
                         if match:
                             return float(match.group(1))
         except Exception:
@@ -78,57 +96,19 @@ class ModelManager:
 
     async def _gemini_generate(self, prompt: str, max_retries: int = 3) -> str:
         """Generate text with automatic retry on rate limit errors"""
-        last_error = None
-        
-        for attempt in range(max_retries):
-            try:
-                # ✅ CORRECT: Use truly async method
-                response = await self.client.aio.models.generate_content(
-                    model=self.model_info["model"],
-                    contents=prompt
-                )
-                return response.text.strip()
-
-            except ServerError as e:
-                error_str = str(e)
-                # Check if it's a 429 rate limit error
-                if '429' in error_str or 'RESOURCE_EXHAUSTED' in error_str or 'quota' in error_str.lower():
-                    retry_delay = self._extract_retry_delay(e)
-                    
-                    if retry_delay is None:
-                        # Default exponential backoff: 2^attempt seconds with jitter
-                        retry_delay = (2 ** attempt) + random.uniform(0, 1)
-                    else:
-                        # Add small jitter to server-suggested delay
-                        retry_delay += random.uniform(0, 2)
-                    
-                    if attempt < max_retries - 1:
-                        print(f"⚠️  Rate limit exceeded (attempt {attempt + 1}/{max_retries}). Retrying in {retry_delay:.1f}s...")
-                        await asyncio.sleep(retry_delay)
-                        last_error = e
-                        continue
-                    else:
-                        raise RuntimeError(
-                            f"Gemini generation failed after {max_retries} attempts due to rate limiting. "
-                            f"Last error: {error_str}. Please wait and try again later."
-                        )
-                else:
-                    # Not a rate limit error, raise immediately
-                    raise e
-            except Exception as e:
-                # ✅ Handle other potential errors
-                raise RuntimeError(f"Gemini generation failed: {str(e)}")
-        
-        # Should not reach here, but just in case
-        raise RuntimeError(f"Gemini generation failed after {max_retries} attempts: {str(last_error)}")
+        return await self._gemini_call(prompt, max_retries, "generation")
 
     async def _gemini_generate_content(self, contents: list, max_retries: int = 3) -> str:
         """Generate content with support for text and images using Gemini, with retry on rate limits"""
+        return await self._gemini_call(contents, max_retries, "content generation")
+
+    async def _gemini_call(self, contents, max_retries: int = 3, label: str = "generation") -> str:
+        """Shared Gemini request loop; `contents` is a prompt string or a text/image list"""
         last_error = None
-        
+
         for attempt in range(max_retries):
             try:
-                # ✅ Use async method with contents array (text + images)
+                # ✅ CORRECT: Use truly async method
                 response = await self.client.aio.models.generate_content(
                     model=self.model_info["model"],
                     contents=contents
@@ -138,16 +118,16 @@ class ModelManager:
             except ServerError as e:
                 error_str = str(e)
                 # Check if it's a 429 rate limit error
-                if '429' in error_str or 'RESOURCE_EXHAUSTED' in error_str or 'quota' in error_str.lower():
+                if any(t in error_str for t in _RATE_LIMIT_TOKENS) or 'quota' in error_str.lower():
                     retry_delay = self._extract_retry_delay(e)
-                    
+
                     if retry_delay is None:
                         # Default exponential backoff: 2^attempt seconds with jitter
                         retry_delay = (2 ** attempt) + random.uniform(0, 1)
                     else:
                         # Add small jitter to server-suggested delay
                         retry_delay += random.uniform(0, 2)
-                    
+
                     if attempt < max_retries - 1:
                         print(f"⚠️  Rate limit exceeded (attempt {attempt + 1}/{max_retries}). Retrying in {retry_delay:.1f}s...")
                         await asyncio.sleep(retry_delay)
@@ -155,7 +135,7 @@ class ModelManager:
                         continue
                     else:
                         raise RuntimeError(
-                            f"Gemini content generation failed after {max_retries} attempts due to rate limiting. "
+                            f"Gemini {label} failed after {max_retries} attempts due to rate limiting. "
                             f"Last error: {error_str}. Please wait and try again later."
                         )
                 else:
@@ -163,22 +143,31 @@ class ModelManager:
                     raise e
             except Exception as e:
                 # ✅ Handle other potential errors
-                raise RuntimeError(f"Gemini content generation failed: {str(e)}")
-        
+                raise RuntimeError(f"Gemini {label} failed: {str(e)}")
+
         # Should not reach here, but just in case
-        raise RuntimeError(f"Gemini content generation failed after {max_retries} attempts: {str(last_error)}")
+        raise RuntimeError(f"Gemini {label} failed after {max_retries} attempts: {str(last_error)}")
 
     async def _ollama_generate(self, prompt: str) -> str:
         try:
-            # ✅ Use aiohttp for truly async requests
+            # ✅ Use aiohttp for truly async requests, reusing one connection pool
             import aiohttp
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.model_info["url"]["generate"],
-                    json={"model": self.model_info["model"], "prompt": prompt, "stream": False}
-                ) as response:
-                    response.raise_for_status()
-                    result = await response.json()
-                    return result["response"].strip()
+            if self._http_session is None or self._http_session.closed:
+                self._http_session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=60)
+                )
+            async with self._http_session.post(
+                self.model_info["url"]["generate"],
+                json={"model": self.model_info["model"], "prompt": prompt, "stream": False}
+            ) as response:
+                response.raise_for_status()
+                result = await response.json()
+                return result["response"].strip()
         except Exception as e:
             raise RuntimeError(f"Ollama generation failed: {str(e)}")
+
+    async def aclose(self):
+        """Close the shared HTTP session, if one was opened"""
+        if self._http_session is not None and not self._http_session.closed:
+            await self._http_session.close()
+        self._http_session = None
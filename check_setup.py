@@ -1,6 +1,8 @@
 """Check if all required components are set up correctly"""
 import sys
 import os
+import asyncio
+import importlib.util
 from pathlib import Path
 
 # Fix Windows console encoding
@@ -11,119 +13,108 @@ if sys.platform == "win32":
     if hasattr(sys.stderr, 'buffer'):
         sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
-def check_playwright():
+# The checks run concurrently, so each one collects its report lines in `out`
+# and main() prints them in order once everything has finished.
+
+async def check_playwright(out: list) -> bool:
     """Check if Playwright and Chromium are installed"""
     try:
         from playwright.async_api import async_playwright
-        import asyncio
-        
-        async def test():
-            pw = await async_playwright().start()
-            browser = await pw.chromium.launch(headless=True)
-            await browser.close()
-            await pw.stop()
-        
-        asyncio.run(test())
-        print("✅ Playwright Chromium is installed and working")
+
+        pw = await async_playwright().start()
+        browser = await pw.chromium.launch(headless=True)
+        await browser.close()
+        await pw.stop()
+
+        out.append("✅ Playwright Chromium is installed and working")
         return True
     except Exception as e:
-        print(f"❌ Playwright issue: {e}")
-        print("   Fix: Run: python -m playwright install chromium")
+        out.append(f"❌ Playwright issue: {e}")
+        out.append("   Fix: Run: python -m playwright install chromium")
         return False
 
-def check_browser_server():
+def _port_open(port: int) -> bool:
+    import socket
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.settimeout(1)
+    result = sock.connect_ex(('localhost', port))
+    sock.close()
+    return result == 0
+
+async def check_browser_server(out: list) -> bool:
     """Check if browser MCP server is running"""
     try:
-        import httpx
-        import asyncio
-        
-        async def test():
-            try:
-                async with httpx.AsyncClient(timeout=3.0, follow_redirects=True) as client:
-                    # Try to connect to the SSE endpoint
-                    # SSE endpoints keep connections open, so we use stream and timeout quickly
-                    async with client.stream("GET", "http://localhost:8100/sse", timeout=2.0) as response:
-                        # If we get a response (even if it's streaming), server is reachable
-                        status = response.status_code
-                        # Read a bit to see if connection works
-                        try:
-                            await asyncio.wait_for(response.aread(), timeout=1.0)
-                        except asyncio.TimeoutError:
-                            # Timeout is OK for SSE - it means connection is open
-                            pass
-                        return status < 500
-            except httpx.TimeoutException:
-                # Timeout might mean server is keeping connection open (normal for SSE)
-                return True
-            except httpx.ConnectError:
-                return False
-        
-        result = asyncio.run(test())
-        if result:
-            print("✅ Browser MCP server is running on port 8100")
+        from utils.health import cached_health, close_http
+
+        try:
+            ok = await cached_health("http://localhost:8100/sse")
+        finally:
+            await close_http()
+        if ok:
+            out.append("✅ Browser MCP server is running on port 8100")
             return True
-        else:
-            print("⚠️  Browser MCP server returned an error")
-            return False
+        error = "SSE endpoint did not respond"
     except Exception as e:
-        # Check if port is at least listening
-        try:
-            import socket
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(1)
-            result = sock.connect_ex(('localhost', 8100))
-            sock.close()
-            if result == 0:
-                print("⚠️  Port 8100 is open but SSE endpoint may not be responding correctly")
-                print(f"   Error: {e}")
-                return False
-        except:
-            pass
-        print("❌ Browser MCP server is NOT running")
-        print("   Fix: Run in a separate terminal: uv run .\\browserMCP\\browser_mcp_sse.py")
-        return False
+        error = e
+
+    # Check if port is at least listening
+    try:
+        if await asyncio.to_thread(_port_open, 8100):
+            out.append("⚠️  Port 8100 is open but SSE endpoint may not be responding correctly")
+            out.append(f"   Error: {error}")
+            return False
+    except:
+        pass
+    out.append("❌ Browser MCP server is NOT running")
+    out.append("   Fix: Run in a separate terminal: uv run .\\browserMCP\\browser_mcp_sse.py")
+    return False
 
-def check_dependencies():
+async def check_dependencies(out: list) -> bool:
     """Check if required dependencies are installed"""
     required = ['playwright', 'psutil', 'patchright', 'posthog']
     missing = []
-    
+
     for dep in required:
-        try:
-            __import__(dep)
-            print(f"✅ {dep} is installed")
-        except ImportError:
-            print(f"❌ {dep} is missing")
+        # find_spec only consults the import finders; it doesn't execute the package
+        if importlib.util.find_spec(dep) is not None:
+            out.append(f"✅ {dep} is installed")
+        else:
+            out.append(f"❌ {dep} is missing")
             missing.append(dep)
-    
+
     if missing:
-        print(f"\n   Fix: Run: uv pip install {' '.join(missing)}")
+        out.append(f"\n   Fix: Run: uv pip install {' '.join(missing)}")
         return False
     return True
 
-def main():
+async def main():
     print("=" * 60)
     print("[CHECK] Checking Browser Automation Setup")
     print("=" * 60)
     print()
-    
+
+    checks = [
+        ("1. Checking dependencies...", check_dependencies),
+        ("2. Checking Playwright installation...", check_playwright),
+        ("3. Checking browser MCP server...", check_browser_server),
+    ]
+    outputs = [[] for _ in checks]
+    results = await asyncio.gather(
+        *(check(out) for (_, check), out in zip(checks, outputs)),
+        return_exceptions=True,
+    )
+
     all_ok = True
-    
-    print("1. Checking dependencies...")
-    if not check_dependencies():
-        all_ok = False
-    print()
-    
-    print("2. Checking Playwright installation...")
-    if not check_playwright():
-        all_ok = False
-    print()
-    
-    print("3. Checking browser MCP server...")
-    if not check_browser_server():
-        all_ok = False
-    print()
-    
+    for (title, _), out, result in zip(checks, outputs, results):
+        print(title)
+        for line in out:
+            print(line)
+        if isinstance(result, BaseException):
+            print(f"❌ Check failed unexpectedly: {result}")
+        if result is not True:
+            all_ok = False
+        print()
+
     print("=" * 60)
     if all_ok:
         print("✅ All checks passed! You're ready to run the application.")
@@ -135,9 +126,8 @@ def main():
         print("3. Start browser MCP server: uv run .\\browserMCP\\browser_mcp_sse.py")
         print("4. Then start main app: uv run .\\main.py")
     print("=" * 60)
-    
+
     return 0 if all_ok else 1
 
 if __name__ == "__main__":
-    sys.exit(main())
-
+    sys.exit(asyncio.run(main()))
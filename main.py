@@ -1,11 +1,23 @@
 from utils.utils import log_step, log_error
 import asyncio
-import yaml
+import json
+import math
+from collections import deque
+from itertools import islice
+import os
 from dotenv import load_dotenv
 from mcp_servers.multiMCP import MultiMCP
 from agent.agent_loop3 import AgentLoop  # 🆕 Use loop3
 from pprint import pprint
-import httpx
+from utils.health import cached_health, close_http
+from utils.yaml_loader import load_yaml
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MAX_HISTORY_TURNS = 10  # past rounds replayed to the agent as context
 
 BANNER = """
 ──────────────────────────────────────────────────────
@@ -15,40 +27,74 @@ Type 'exit' or 'quit' to leave.
 ──────────────────────────────────────────────────────
 """
 
+def _sidecar_safe(obj) -> bool:
+    """True if `obj` comes back unchanged from a JSON round trip.
+
+    JSON turns non-str keys into str, and orjson writes NaN/Infinity as null.
+    """
+    if isinstance(obj, float):
+        return math.isfinite(obj)
+    if isinstance(obj, dict):
+        return all(isinstance(k, str) and _sidecar_safe(v) for k, v in obj.items())
+    if isinstance(obj, list):
+        return all(_sidecar_safe(v) for v in obj)
+    return True
+
+
+def load_config_cached(path: str) -> dict:
+    """Load a YAML config, reusing a JSON sidecar while the YAML file is unchanged"""
+    cache_path = path + ".cache.json"
+    mtime = os.stat(path).st_mtime_ns
+
+    try:
+        with open(cache_path, "rb") as f:
+            raw = f.read()
+        cached = orjson.loads(raw) if orjson else json.loads(raw)
+        if cached.get("mtime_ns") == mtime:
+            return cached["data"]
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass  # missing or stale sidecar → parse the YAML
+
+    with open(path, "r") as f:
+        data = load_yaml(f)
+
+    # Best effort: a read-only checkout or non-JSON YAML values just skip the cache
+    if not _sidecar_safe(data):
+        return data
+    tmp_path = cache_path + ".tmp"
+    try:
+        entry = {"mtime_ns": mtime, "data": data}
+        if orjson:
+            # Dates etc. must not round-trip as strings, so let them fail like stdlib json;
+            # non-finite floats were already ruled out by _sidecar_safe
+            raw = orjson.dumps(entry, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        else:
+            raw = json.dumps(entry).encode("utf-8")
+        with open(tmp_path, "wb") as f:
+            f.write(raw)
+        os.replace(tmp_path, cache_path)
+    except (OSError, TypeError, ValueError):
+        pass
+    return data
+
 async def interactive() -> None:
     log_step(BANNER, symbol="")
     log_step('Loading MCP Servers...', symbol="📥")
 
     # Load MCP server configs
-    with open("config/mcp_server_config.yaml", "r") as f:
-        profile = yaml.safe_load(f)
-        mcp_servers_list = profile.get("mcp_servers", [])
-        configs = list(mcp_servers_list)
+    profile = load_config_cached("config/mcp_server_config.yaml")
+    mcp_servers_list = profile.get("mcp_servers", [])
+    configs = list(mcp_servers_list)
     
     # Check if browser MCP server is running (SSE endpoints need special handling)
     browser_server_config = next((c for c in configs if c.get("id") == "webbrowsing"), None)
     if browser_server_config:
         browser_url = browser_server_config.get("script", "")
         if browser_url.startswith("http"):
-            try:
-                # For SSE endpoints, use stream to check connectivity (they keep connections open)
-                async with httpx.AsyncClient(timeout=3.0) as client:
-                    try:
-                        async with client.stream("GET", browser_url) as response:
-                            # If we get a response (even if streaming), server is reachable
-                            if response.status_code < 500:
-                                log_step(f"✅ Browser MCP server is running at {browser_url}", symbol="✅")
-                            else:
-                                log_step(f"⚠️  Browser MCP server returned error {response.status_code}", symbol="⚠️")
-                    except httpx.TimeoutException:
-                        # Timeout is OK for SSE - it means the server accepted the connection
-                        # and is keeping it open (which is expected behavior)
-                        log_step(f"✅ Browser MCP server is running at {browser_url} (SSE connection open)", symbol="✅")
-                    except httpx.ConnectError:
-                        log_step(f"⚠️  Browser MCP server not reachable at {browser_url}. Start it with: uv run .\\browserMCP\\browser_mcp_sse.py", symbol="⚠️")
-            except Exception as e:
-                # For other exceptions, just warn but don't fail (SSE servers are optional)
-                log_step(f"⚠️  Could not verify browser MCP server at {browser_url}. If server is running, connection will be attempted anyway. Error: {type(e).__name__}", symbol="⚠️")
+            if await cached_health(browser_url):
+                log_step(f"✅ Browser MCP server is running at {browser_url}", symbol="✅")
+            else:
+                log_step(f"⚠️  Browser MCP server not reachable at {browser_url}. Start it with: uv run .\\browserMCP\\browser_mcp_sse.py", symbol="⚠️")
 
     # Initialize MultiMCP dispatcher
     multi_mcp = MultiMCP(server_configs=configs)
@@ -57,11 +103,12 @@ async def interactive() -> None:
     # Log loaded tools for debugging
     all_tools = multi_mcp.get_all_tools()
     tool_names = [tool.name for tool in all_tools]
-    log_step(f"Loaded {len(tool_names)} tools: {', '.join(tool_names[:10])}{'...' if len(tool_names) > 10 else ''}", symbol="✅")
+    log_step(f"Loaded {len(tool_names)} tools: {', '.join(islice(tool_names, 10))}{'...' if len(tool_names) > 10 else ''}", symbol="✅")
     
     # Check if browser tools are available
     browser_tools = ['open_tab', 'search_google', 'input_text_by_index', 'click_element_by_index']
-    missing_browser_tools = [tool for tool in browser_tools if tool not in tool_names]
+    available_tools = set(tool_names)
+    missing_browser_tools = [tool for tool in browser_tools if tool not in available_tools]
     if missing_browser_tools:
         log_step(f"⚠️  Browser tools not available: {', '.join(missing_browser_tools)}. Make sure browser MCP server is running on port 8100.", symbol="⚠️")
 
@@ -75,7 +122,9 @@ async def interactive() -> None:
         strategy="exploratory"
     )
 
-    conversation_history = []  # stores (query, response) tuples
+    # "Query i: ..." / "Response i: ..." lines from past rounds, oldest dropped first
+    history_lines = deque(maxlen=2 * MAX_HISTORY_TURNS)
+    turn = 0
 
     try:
         while True:
@@ -85,16 +134,13 @@ async def interactive() -> None:
                 log_step("Goodbye!", symbol="👋")
                 break
 
-            # Construct context string from past rounds
-            context_prefix = ""
-            for idx, (q, r) in enumerate(conversation_history, start=1):
-                context_prefix += f"Query {idx}: {q}\nResponse {idx}: {r}\n"
-
-            full_query = context_prefix + f"Query {len(conversation_history)+1}: {query}"
+            full_query = "".join(history_lines) + f"Query {turn + 1}: {query}"
 
             try:
-                response = await loop.run(full_query)  # 🔄 stateless loop sees full pseudo-history
-                conversation_history.append((query, response.strip()))
+                response = await loop.run(full_query)  # 🔄 stateless loop sees recent pseudo-history
+                turn += 1
+                history_lines.append(f"Query {turn}: {query}\n")
+                history_lines.append(f"Response {turn}: {response.strip()}\n")
                 log_step("Agent Resting now", symbol="😴")
             except Exception as e:
                 if "Unknown SSE event" in str(e):
@@ -107,7 +153,9 @@ async def interactive() -> None:
                 log_step("Goodbye!", symbol="👋")
                 break
     finally:
+        await loop.aclose()
         await multi_mcp.shutdown()
+        await close_http()
 
 if __name__ == "__main__":
     load_dotenv()
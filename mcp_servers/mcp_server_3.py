@@ -5,6 +5,8 @@ from typing import List, Dict, Optional, Any
 from dataclasses import dataclass
 import urllib.parse
 import sys
+import logging
+import logging.handlers
 import traceback
 from datetime import datetime, timedelta
 import time
@@ -21,7 +23,8 @@ from dotenv import load_dotenv
 import asyncio
 import os
 import random
-import re
+import hashlib
+from collections import OrderedDict
 
 # Fix Windows encoding issues
 if sys.platform == "win32":
@@ -33,6 +36,14 @@ if sys.platform == "win32":
 
 load_dotenv()
 
+log = logging.getLogger(__name__)
+
+_RETRY_IN_RE = re.compile(r'retry in ([\d.]+)s', re.IGNORECASE)
+_DURATION_RE = re.compile(r'([\d.]+)s')
+_QUOTA_RE = re.compile(r'quota', re.IGNORECASE)
+
+MAX_PAGE_CHARS = 3000  # page text passed back to the agent / into summary prompts
+
 # Initialize FastMCP server
 mcp = FastMCP("ddg-search")
 
@@ -52,7 +63,7 @@ def extract_retry_delay(error: Exception) -> float:
     try:
         error_str = str(error)
         # Look for retry delay in error message: "Please retry in 47.452700763s"
-        match = re.search(r'retry in ([\d.]+)s', error_str, re.IGNORECASE)
+        match = _RETRY_IN_RE.search(error_str)
         if match:
             return float(match.group(1))
         
@@ -63,13 +74,31 @@ def extract_retry_delay(error: Exception) -> float:
                 if detail.get('@type') == 'type.googleapis.com/google.rpc.RetryInfo':
                     retry_delay = detail.get('retryDelay', '')
                     # Parse duration string like "47s" or "47.452700763s"
-                    match = re.search(r'([\d.]+)s', retry_delay)
+                    match = _DURATION_RE.search(retry_delay)
                     if match:
                         return float(match.group(1))
     except Exception:
         pass
     return None
 
+def _is_rate_limit(error: Exception, error_str: str) -> bool:
+    # Typed SDK errors carry the HTTP status; only fall back to scanning the message
+    if getattr(error, 'code', None) == 429:
+        return True
+    return '429' in error_str or 'RESOURCE_EXHAUSTED' in error_str or _QUOTA_RE.search(error_str) is not None
+
+async def _sleep_retry(error: Exception, attempt: int, max_retries: int) -> None:
+    """Back off before the next attempt, preferring the server-suggested delay"""
+    retry_delay = extract_retry_delay(error)
+    if retry_delay is None:
+        # Default exponential backoff: 2^attempt seconds with jitter
+        retry_delay = (2 ** attempt) + random.uniform(0, 1)
+    else:
+        # Add small jitter to server-suggested delay
+        retry_delay += random.uniform(0, 2)
+    mcp_log("WARN", f"Rate limit exceeded (attempt {attempt + 1}/{max_retries}). Retrying in {retry_delay:.1f}s...")
+    await asyncio.sleep(retry_delay)
+
 async def generate_with_retry(prompt: str, max_retries: int = 3) -> str:
     """Generate content with automatic retry on rate limit errors"""
     client = get_client()
@@ -77,63 +106,95 @@ async def generate_with_retry(prompt: str, max_retries: int = 3) -> str:
     
     for attempt in range(max_retries):
         try:
-            # Run synchronous call in thread pool to avoid blocking event loop
-            def _generate():
-                return client.models.generate_content(
-                    model="gemini-2.5-flash-lite",
-                    contents=prompt
-                )
-            response = await asyncio.to_thread(_generate)
-            return response.candidates[0].content.parts[0].text
+            # Stream the response and join the chunk texts, so text split
+            # across several parts isn't truncated to the first one
+            parts = []
+            stream = await client.aio.models.generate_content_stream(
+                model="gemini-2.5-flash-lite",
+                contents=prompt
+            )
+            async for chunk in stream:
+                if chunk.text:
+                    parts.append(chunk.text)
+            if not parts:
+                # Safety-blocked, no candidates, or only non-text parts
+                raise RuntimeError("response contained no text")
+            return "".join(parts)
             
-        except ServerError as e:
-            error_str = str(e)
-            # Check if it's a 429 rate limit error
-            if '429' in error_str or 'RESOURCE_EXHAUSTED' in error_str or 'quota' in error_str.lower():
-                retry_delay = extract_retry_delay(e)
-                
-                if retry_delay is None:
-                    # Default exponential backoff: 2^attempt seconds with jitter
-                    retry_delay = (2 ** attempt) + random.uniform(0, 1)
-                else:
-                    # Add small jitter to server-suggested delay
-                    retry_delay += random.uniform(0, 2)
-                
-                if attempt < max_retries - 1:
-                    mcp_log("WARN", f"Rate limit exceeded (attempt {attempt + 1}/{max_retries}). Retrying in {retry_delay:.1f}s...")
-                    await asyncio.sleep(retry_delay)
-                    last_error = e
-                    continue
-                else:
-                    raise RuntimeError(
-                        f"Gemini generation failed after {max_retries} attempts due to rate limiting. "
-                        f"Last error: {error_str}. Please wait and try again later."
-                    )
-            else:
-                # Not a rate limit error, raise immediately
-                raise e
         except Exception as e:
-            # Check if it's a rate limit error in the exception message
+            # Rate limits can surface as ServerError or as other SDK errors
             error_str = str(e)
-            if '429' in error_str or 'RESOURCE_EXHAUSTED' in error_str or 'quota' in error_str.lower():
-                retry_delay = extract_retry_delay(e)
-                
-                if retry_delay is None:
-                    retry_delay = (2 ** attempt) + random.uniform(0, 1)
-                else:
-                    retry_delay += random.uniform(0, 2)
-                
-                if attempt < max_retries - 1:
-                    mcp_log("WARN", f"Rate limit exceeded (attempt {attempt + 1}/{max_retries}). Retrying in {retry_delay:.1f}s...")
-                    await asyncio.sleep(retry_delay)
-                    last_error = e
-                    continue
-            raise RuntimeError(f"Gemini generation failed: {str(e)}")
+            if not _is_rate_limit(e, error_str):
+                if isinstance(e, ServerError):
+                    # Not a rate limit error, raise immediately
+                    raise
+                raise RuntimeError(f"Gemini generation failed: {error_str}")
+            if attempt == max_retries - 1:
+                raise RuntimeError(
+                    f"Gemini generation failed after {max_retries} attempts due to rate limiting. "
+                    f"Last error: {error_str}. Please wait and try again later."
+                )
+            last_error = e
+            await _sleep_retry(e, attempt, max_retries)
     
     # Should not reach here, but just in case
     raise RuntimeError(f"Gemini generation failed after {max_retries} attempts: {str(last_error)}")
 
 
+# Short-lived cache of page extractions, so raw_text + llm_summary on the same URL
+# share one fetch. Concurrent requests for a URL wait on the same in-flight task.
+EXTRACT_TTL = 60
+_extract_cache: Dict[str, tuple] = {}  # url -> (monotonic timestamp, result)
+_extract_inflight: Dict[str, asyncio.Task] = {}
+
+async def _extract_and_store(url: str) -> dict:
+    try:
+        extracted = await smart_web_extract(url, max_chars=MAX_PAGE_CHARS)
+        # Keep only what the tools read; the raw text fields can be several MB per page
+        result = {
+            "best_text": extracted.get("best_text", ""),
+            "best_text_source": extracted.get("best_text_source", ""),
+        }
+        if result["best_text_source"] not in ("error", "timeout"):
+            now = time.monotonic()
+            for key in [k for k, (ts, _) in _extract_cache.items() if now - ts >= EXTRACT_TTL]:
+                del _extract_cache[key]
+            _extract_cache[url] = (now, result)
+        return result
+    finally:
+        _extract_inflight.pop(url, None)
+
+async def cached_extract(url: str, ttl: float = EXTRACT_TTL) -> dict:
+    """smart_web_extract with a per-URL TTL cache and in-flight deduplication"""
+    entry = _extract_cache.get(url)
+    if entry is not None and time.monotonic() - entry[0] < ttl:
+        return entry[1]
+    task = _extract_inflight.get(url)
+    if task is None:
+        task = _extract_inflight[url] = asyncio.create_task(_extract_and_store(url))
+    # shield: a caller timing out must not cancel the fetch other callers are waiting on
+    return await asyncio.shield(task)
+
+
+# LRU of summaries keyed by a hash of the full prompt (instruction + page text)
+SUMMARY_CACHE_SIZE = 512
+_summary_cache: "OrderedDict[bytes, str]" = OrderedDict()
+
+def _summary_cache_get(key: bytes) -> Optional[str]:
+    summary = _summary_cache.get(key)
+    if summary is not None:
+        _summary_cache.move_to_end(key)
+    return summary
+
+def _summary_cache_put(key: bytes, summary: str) -> None:
+    if not summary:
+        return
+    _summary_cache[key] = summary
+    _summary_cache.move_to_end(key)
+    if len(_summary_cache) > SUMMARY_CACHE_SIZE:
+        _summary_cache.popitem(last=False)
+
+
 # Duckduck not responding? Check this: https://html.duckduckgo.com/html?q=Model+Context+Protocol
 @mcp.tool()
 async def web_search_urls(input: SearchInput, ctx: Context) -> URLListOutput:
@@ -155,25 +216,16 @@ async def web_search_urls(input: SearchInput, ctx: Context) -> URLListOutput:
         mcp_log("INFO", f"Searching for: {query[:100]} (max_results={max_results})")
         urls = await smart_search(query, max_results)
         
-        # Ensure all URLs are properly encoded strings
+        # Python str is already valid Unicode; only non-str results need converting
         encoded_urls = []
         for url in urls:
-            try:
-                # Try to encode/decode to ensure it's valid UTF-8
-                if isinstance(url, str):
-                    url.encode('utf-8', errors='replace').decode('utf-8')
-                    # Basic URL validation
-                    if url.startswith(('http://', 'https://')):
-                        encoded_urls.append(url)
-                    else:
-                        mcp_log("WARN", f"Skipping invalid URL format: {url[:50]}")
-                else:
-                    url_str = str(url).encode('utf-8', errors='replace').decode('utf-8')
-                    if url_str.startswith(('http://', 'https://')):
-                        encoded_urls.append(url_str)
-            except Exception as url_err:
-                # If encoding fails, use a safe representation
-                mcp_log("WARN", f"URL encoding error: {url_err}")
+            if not isinstance(url, str):
+                url = str(url)
+            # Basic URL validation
+            if url.startswith(('http://', 'https://')):
+                encoded_urls.append(url)
+            else:
+                mcp_log("WARN", f"Skipping invalid URL format: {url[:50]}")
         
         if not encoded_urls:
             return URLListOutput(result=[f"[error] No valid URLs found for query: {query[:100]}"])
@@ -183,7 +235,8 @@ async def web_search_urls(input: SearchInput, ctx: Context) -> URLListOutput:
     except Exception as e:
         error_msg = str(e).encode('utf-8', errors='replace').decode('utf-8')
         mcp_log("ERROR", f"web_search_urls failed: {error_msg}")
-        traceback.print_exc(file=sys.stderr)
+        # Traceback only when LOG_LEVEL=DEBUG; formatting it is wasted work otherwise
+        log.debug("web_search_urls failed", exc_info=True)
         return URLListOutput(result=[f"[error] Search failed: {error_msg}"])
 
 
@@ -191,12 +244,12 @@ async def web_search_urls(input: SearchInput, ctx: Context) -> URLListOutput:
 async def webpage_url_to_raw_text(url: str) -> dict:
     """Extract readable text from a webpage"""
     try:
-        result = await asyncio.wait_for(smart_web_extract(url), timeout=25)
+        result = await asyncio.wait_for(cached_extract(url), timeout=25)
         return {
             "content": [
                 TextContent(
                     type="text",
-                    text=f"[{result.get('best_text_source', '')}] " + result.get("best_text", "")[:3000]
+                    text=f"[{result.get('best_text_source', '')}] {result.get('best_text', '')}"
                 )
             ]
         }
@@ -253,8 +306,8 @@ async def webpage_url_to_llm_summary(input: SummaryInput, ctx: Context) -> dict:
                 }
         
         mcp_log("INFO", f"Extracting content from: {url[:100]}")
-        result = await asyncio.wait_for(smart_web_extract(url), timeout=25)
-        text = result.get("best_text", "")[:3000]
+        result = await asyncio.wait_for(cached_extract(url), timeout=25)
+        text = result.get("best_text", "")
 
         if not text.strip():
             return {
@@ -266,7 +319,7 @@ async def webpage_url_to_llm_summary(input: SummaryInput, ctx: Context) -> dict:
                 ]
             }
 
-        clean_text = text.encode("utf-8", errors="replace").decode("utf-8").strip()
+        clean_text = text.strip()
 
         prompt = input.prompt or (
             "Summarize this text as best as possible. Keep important entities and values intact. "
@@ -275,9 +328,14 @@ async def webpage_url_to_llm_summary(input: SummaryInput, ctx: Context) -> dict:
 
         full_prompt = f"{prompt.strip()}\n\n[text below]\n{clean_text}"
 
-        # Use retry-enabled generation function
-        raw = await generate_with_retry(full_prompt)
-        summary = raw.encode("utf-8", errors="replace").decode("utf-8").strip()
+        # Same prompt over the same page text → reuse the earlier summary
+        cache_key = hashlib.blake2b(full_prompt.encode("utf-8", errors="replace"), digest_size=16).digest()
+        summary = _summary_cache_get(cache_key)
+        if summary is None:
+            # Use retry-enabled generation function
+            raw = await generate_with_retry(full_prompt)
+            summary = raw.encode("utf-8", errors="replace").decode("utf-8").strip()
+            _summary_cache_put(cache_key, summary)
 
         return {
             "content": [
@@ -309,12 +367,36 @@ async def webpage_url_to_llm_summary(input: SummaryInput, ctx: Context) -> dict:
         }
 
 
+class _BatchedStderrHandler(logging.handlers.MemoryHandler):
+    """Buffers records and writes them to stderr in a single call per flush."""
+
+    def flush(self) -> None:
+        with self.lock:
+            if self.buffer:
+                sys.stderr.write("".join(self.format(record) + "\n" for record in self.buffer))
+                sys.stderr.flush()
+                self.buffer.clear()
+
+
+# mcp_log output is batched: flushed every 16 lines, on WARN and above, and at exit
+_mcp_logger = logging.getLogger(f"{__name__}.mcp_log")
+_mcp_logger.setLevel(logging.DEBUG)
+_mcp_logger.propagate = False
+_mcp_logger.addHandler(_BatchedStderrHandler(capacity=16, flushLevel=logging.WARNING))
+
+_MCP_LOG_LEVELS = {"DEBUG": logging.DEBUG, "INFO": logging.INFO, "WARN": logging.WARNING, "ERROR": logging.ERROR}
+
+
 def mcp_log(level: str, message: str) -> None:
-    sys.stderr.write(f"{level}: {message}\n")
-    sys.stderr.flush()
+    _mcp_logger.log(_MCP_LOG_LEVELS.get(level, logging.INFO), f"{level}: {message}")
 
 
 if __name__ == "__main__":
+    # stderr only: stdout carries the stdio MCP transport
+    log_level = logging.getLevelName(os.getenv("LOG_LEVEL", "WARNING").upper())
+    if not isinstance(log_level, int):
+        log_level = logging.WARNING  # unknown name, e.g. LOG_LEVEL=verbose
+    logging.basicConfig(stream=sys.stderr, level=log_level)
     try:
         sys.stderr.write("mcp_server_3.py READY\n")
         sys.stderr.flush()
@@ -3,7 +3,7 @@ import os
 import sys
 import json
 from pathlib import Path
-from typing import Optional, Any, List, Dict
+from typing import Optional, Any, Callable, List, Dict, Tuple, FrozenSet
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 import ast
@@ -128,6 +128,8 @@ class MultiMCP:
         self.tool_map: Dict[str, Dict[str, Any]] = {}
         self.server_tools: Dict[str, List[Any]] = {}
         self.client_cache: Dict[str, MCP] = {}
+        # (tool names, {name: proxy}, frozenset of names); see get_tool_proxies()
+        self._tool_proxies: Optional[tuple] = None
 
     async def initialize(self):
         for config in self.server_configs:
@@ -168,6 +170,7 @@ class MultiMCP:
                 log_step(f"Scanning tools from: {config['script']} ({transport})", symbol="→ ")
                 tools = await client.list_tools()
                 log_step(f"Tools received: {[tool.name for tool in tools]}", symbol="→ ")
+                self._tool_proxies = None
                 for tool in tools:
                     self.tool_map[tool.name] = {
                         "config": config,
@@ -332,6 +335,26 @@ class MultiMCP:
             examples.append(f"{tool.name}({signature_str})  # {tool.description}")
         return examples
 
+    def get_tool_proxies(self) -> Tuple[Dict[str, Callable], FrozenSet[str]]:
+        """Return `{name: async proxy}` for every tool plus the frozenset of tool names.
+
+        Built once and reused until the tool list changes.
+        """
+        tool_names = tuple(self.tool_map)
+        cached = self._tool_proxies
+        if cached is not None and cached[0] == tool_names:
+            return cached[1], cached[2]
+
+        def make_proxy(tool_name: str):
+            async def _tool_fn(*args):
+                return await self.function_wrapper(tool_name, *args)
+            return _tool_fn
+
+        proxies = {name: make_proxy(name) for name in tool_names}
+        names = frozenset(tool_names)
+        self._tool_proxies = (tool_names, proxies, names)
+        return proxies, names
+
     def list_all_tools(self) -> List[str]:
         return list(self.tool_map.keys())
 
@@ -38,8 +38,9 @@ def is_difficult_website(url: str) -> bool:
         return False
 
 # Make sure these utilities exist
-def ascii_only(text: str) -> str:
-    return text.encode("ascii", errors="ignore").decode()
+def ascii_only(text: str, max_chars: int | None = None) -> str:
+    text = text.encode("ascii", errors="ignore").decode()
+    return text if max_chars is None else text[:max_chars]
 
 def choose_best_text(visible, main, trafilatura_):
     # Simple heuristic: prefer main if long, fallback otherwise
@@ -55,7 +56,7 @@ def choose_best_text(visible, main, trafilatura_):
         "trafilatura": trafilatura_
     }[best], best
 
-async def web_tool_playwright(url: str, max_total_wait: int = 15) -> dict:
+async def web_tool_playwright(url: str, max_total_wait: int = 15, max_chars: int | None = None) -> dict:
     result = {"url": url}
 
     try:
@@ -114,7 +115,7 @@ async def web_tool_playwright(url: str, max_total_wait: int = 15) -> dict:
                 "text": visible_text,
                 "main_text": main_text,
                 "trafilatura_text": trafilatura_text,
-                "best_text": ascii_only(best_text),
+                "best_text": ascii_only(best_text, max_chars),
                 "best_text_source": source
             })
 
@@ -145,7 +146,8 @@ async def web_tool_playwright(url: str, max_total_wait: int = 15) -> dict:
 
 import httpx
 
-async def smart_web_extract(url: str, timeout: int = 5) -> dict:
+async def smart_web_extract(url: str, timeout: int = 5, max_chars: int | None = None) -> dict:
+    """Fetch and extract page text; `max_chars` truncates best_text before it is returned"""
 
     headers = get_random_headers()
 
@@ -153,7 +155,7 @@ async def smart_web_extract(url: str, timeout: int = 5) -> dict:
 
         if is_difficult_website(url):
             print(f"Detected difficult site ({url}) → skipping fast scrape")
-            return await web_tool_playwright(url)
+            return await web_tool_playwright(url, max_chars=max_chars)
 
 
         async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
@@ -175,7 +177,7 @@ async def smart_web_extract(url: str, timeout: int = 5) -> dict:
                 "text": visible_text,
                 "main_text": main_text,
                 "trafilatura_text": trafilatura_text,
-                "best_text": ascii_only(best_text),
+                "best_text": ascii_only(best_text, max_chars),
                 "best_text_source": best_source
             }
 
@@ -185,7 +187,7 @@ async def smart_web_extract(url: str, timeout: int = 5) -> dict:
         print("Fast scrape failed:", e)
 
     # Fallback
-    return await web_tool_playwright(url)
+    return await web_tool_playwright(url, max_chars=max_chars)
 
 
 if __name__ == "__main__":
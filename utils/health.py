@@ -0,0 +1,78 @@
+import json
+import os
+import time
+from pathlib import Path
+
+import httpx
+
+HEALTH_CACHE = Path.home() / ".cache" / "eag" / "browser_health.json"
+
+# Shared client so repeated probes reuse pooled connections; see get_http()
+_http_client: httpx.AsyncClient | None = None
+
+
+async def get_http() -> httpx.AsyncClient:
+    """Return the shared AsyncClient, creating it on first use."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+            timeout=httpx.Timeout(5.0, connect=2.0),
+            follow_redirects=True,
+        )
+    return _http_client
+
+
+async def close_http() -> None:
+    """Close the shared AsyncClient, if it was opened."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _read_health(url: str) -> dict | None:
+    try:
+        with open(HEALTH_CACHE, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return entry if isinstance(entry, dict) and entry.get("url") == url else None
+
+
+def _write_health(url: str, ok: bool) -> None:
+    try:
+        HEALTH_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = HEALTH_CACHE.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "ok": ok, "ts": time.time()}, f)
+        os.replace(tmp_path, HEALTH_CACHE)
+    except OSError:
+        pass  # cache is best effort
+
+
+async def probe_sse(url: str, timeout: float = 3.0) -> bool:
+    """Check if an SSE endpoint is reachable."""
+    try:
+        client = await get_http()
+        # SSE endpoints keep connections open, so we use stream and only look at the status
+        async with client.stream("GET", url, timeout=timeout) as response:
+            return response.status_code < 500
+    except httpx.TimeoutException:
+        # Timeout is OK for SSE - it means the server accepted the connection
+        # and is keeping it open (which is expected behavior)
+        return True
+    except Exception:
+        # Connection refused, bad URL, etc. - treat as not reachable
+        return False
+
+
+async def cached_health(url: str, ttl: float = 30) -> bool:
+    """Like probe_sse, but skips the network when `url` was healthy less than `ttl` seconds ago."""
+    entry = _read_health(url)
+    if entry and entry.get("ok") and time.time() - entry.get("ts", 0) < ttl:
+        return True
+
+    ok = await probe_sse(url)
+    _write_health(url, ok)
+    return ok
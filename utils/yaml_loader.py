@@ -0,0 +1,9 @@
+import yaml
+
+# Prefer libyaml's C loader when PyYAML was built with it
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load_yaml(stream):
+    """yaml.safe_load, backed by the C loader when available."""
+    return yaml.load(stream, Loader=SafeLoader)